@@ -1,6 +1,9 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import datetime as dt
 from inspect import isclass
 import math
+import multiprocessing as mp
 import os
 import pickle
 import pygraphviz as pgv
@@ -9,17 +12,18 @@ import sys
 import timeit
 
 from deap import gp
+from numba import njit, prange, set_num_threads
 import numpy as np
-from pathos.pools import ProcessPool
-from sklearn.metrics import mean_squared_error, r2_score
 
 
 # Useful directory path.
 
 
 
-# Seed the relevant random number generator, for reproducibility.
+# Seed the relevant random number generators, for reproducibility.
+# (The `random` module is utilized internally by DEAP.)
 random.seed(37)
+rng = np.random.default_rng(37)
 
 ########################################################################
 # Some helper functions.
@@ -33,13 +37,27 @@ def get_max_size(m, d):
   else:
     return int((1-m**(d+1))/(1-m))
 
+def get_depth(program):
+    """Return the depth of a program, given as a prefix list of nodes."""
+
+    # Stack of depths for nodes outstanding.
+    stack = [0]
+    depth = 0
+
+    for node in program:
+        d = stack.pop()
+        depth = max(depth, d)
+        stack.extend([d+1]*node.arity)
+
+    return depth
+
 def generate_primitive_set(
     function_set, num_variables, num_constants, erc_name):
     """Return tuple containing (i) the primitive set based on 
     the given function set (`function_set`), number of terminal 
     variables (`num_variables`), and number of terminal constants
     (`num_constants`), and (ii) the fixed ephemeral constant
-    list utilized by the primitive set."""
+    tuple utilized by the primitive set."""
 
     primitive_set = gp.PrimitiveSet("main", num_variables, prefix="v")
 
@@ -47,18 +65,16 @@ def generate_primitive_set(
     for op, arity in function_set:
         primitive_set.addPrimitive(op, arity)
 
-    # Create a list of fixed ephemeral random constants.
-    ephemeral_constants = []
-    for i in range(num_constants):
-        ephemeral_constants.append(random.uniform(1,2))
-    
+    # Create a tuple of fixed ephemeral random constants.
+    ephemeral_constants = tuple(rng.uniform(1, 2, num_constants).tolist())
+
     # Add an ephemeral constant to the DEAP primitive set that
-    # returns a random value from the `ephemeral_constants` list 
+    # returns a random value from the `ephemeral_constants` tuple 
     # of random constants. This is done so that there can only
     # exist a particular set of random constants, which is unlike
     # how DEAP would typically implement ephemeral constants.
-    primitive_set.addEphemeralConstant(erc_name, lambda: ephemeral_constants[
-        random.randint(0, num_constants-1)])
+    primitive_set.addEphemeralConstant(
+        erc_name, lambda: random.choice(ephemeral_constants))
 
     return (primitive_set, ephemeral_constants)
 
@@ -72,6 +88,17 @@ def generate_program_(primitive_set, min_depth, max_depth, min_size,
     if ret_type is None:
         ret_type = primitive_set.ret
 
+    # Terminals and functions relevant to the return type.
+    terminals = tuple(primitive_set.terminals[ret_type])
+    primitives = tuple(primitive_set.primitives[ret_type])
+
+    # Valid functions for each remaining size budget `b`, i.e., the
+    # functions with an arity of at most `b`, for every `b` up to the
+    # maximum function arity. (These lists are never modified.)
+    max_function_arity = max([f.arity for f in primitives], default=0)
+    valid_functions_by_budget = [[f for f in primitives if f.arity <= b] 
+        for b in range(max_function_arity+1)]
+
     program = []
 
     if desired_trait == 'depth':
@@ -79,26 +106,36 @@ def generate_program_(primitive_set, min_depth, max_depth, min_size,
     else:
         desired_value = random.randint(min_size, max_size)
 
-    # Initial stack for constructing the relevant program.
-    stack = [(0, 1)]
+    # Initial stack for constructing the relevant program, given
+    # by parallel lists of depths and sizes, with stack pointer `sp`.
+    # (The number of outstanding nodes never exceeds `max_size`.)
+    depth_stack = [0]*(max_size+1)
+    size_stack = [0]*(max_size+1)
+    depth_stack[0], size_stack[0] = 0, 1
+    sp = 1
 
-    while len(stack) != 0:
+    while sp != 0:
 
         # Retrieve the next relevant node within the stack.
         # The value `depth` represents the depth of this
-        # node within the overall random program, the value
-        # `size` represents the current size of the overall
-        # program, and the value `ret_type` represents the 
-        # return type of the current node.
-        depth, size = stack.pop()
+        # node within the overall random program, and the 
+        # value `size` represents the current size of the 
+        # overall program.
+        sp -= 1
+        depth, size = depth_stack[sp], size_stack[sp]
+
+        # Valid functions for the current node, 
+        # based on function arity.
+        valid_functions = valid_functions_by_budget[
+            min(max_size-size, max_function_arity)]
 
-        if (terminal_condition(stack, depth, size, ret_type,
-            primitive_set, min_depth, max_depth, min_size, 
-            max_size, desired_trait, desired_value)):
+        if (terminal_condition(depth_stack[:sp], depth, size, terminals,
+            valid_functions, primitive_set, min_depth, max_depth, 
+            min_size, max_size, desired_trait, desired_value)):
 
             # A random terminal node is to be chosen.
 
-            terminal = random.choice(primitive_set.terminals[ret_type])
+            terminal = random.choice(terminals)
 
             if isclass(terminal):
                 terminal = terminal()
@@ -113,20 +150,14 @@ def generate_program_(primitive_set, min_depth, max_depth, min_size,
             # the current program size. (The size of the upcoming
             # element may already be equal to `size`, but it will
             # never be greater than `size`.)
-            if len(stack) != 0:
-                depth, _ = stack.pop()
-                stack.append((depth, size))
+            if sp != 0:
+                size_stack[sp-1] = size
 
         else:
 
             # A random (valid) function node is to be chosen,
             # if one exists.
 
-            # Valid functions for the current node, 
-            # based on function arity.
-            valid_functions = [f for f in primitive_set.primitives[ret_type] 
-                if size+f.arity <= max_size]
-
             if valid_functions != [] and desired_trait == 'size':
                 # Determine the subset of valid functions that are also
                 # valid for potentially constructing a program of the 
@@ -138,6 +169,16 @@ def generate_program_(primitive_set, min_depth, max_depth, min_size,
                 # are valid for the current node.
                 max_arity = max([f.arity for f in valid_functions])
 
+                # Maximum possible size of the subprograms rooted at 
+                # the outstanding nodes within the current stack, 
+                # excluding these nodes. This maximum size would occur
+                # if every such node is made to be the root of a full 
+                # `max_arity`-ary subtree such that the sum of the depth 
+                # of this subtree and the depth of the root node within 
+                # the overall program is equal to `max_depth`.
+                outstanding_size = sum([max_sizes[max_arity][max_depth-d]-1 
+                    for d in depth_stack[:sp]])
+
                 temp_functions = []
 
                 for f in valid_functions:
@@ -145,20 +186,14 @@ def generate_program_(primitive_set, min_depth, max_depth, min_size,
                     # Maximum possible size of subprogram rooted at the 
                     # current node, excluding this node, if the current 
                     # node is given to be `f`.
-                    max_possible_size = f.arity * get_max_size(
-                        max_arity, max_depth-(depth+1))
+                    max_possible_size = f.arity * max_sizes[
+                        max_arity][max_depth-(depth+1)]
 
                     # Maximum possible program size if the relevant node 
                     # under consideration was chosen to be the function 
-                    # `f`. This maximum size would occur if every out-
-                    # standing node within the current stack is made to 
-                    # be the root of a full `max_arity`-ary subtree such 
-                    # that the sum of the depth of this subtree and the 
-                    # depth of the root node within the overall program 
-                    # is equal to `max_depth`.
-                    max_possible_size = (size + max_possible_size if stack==[]
-                        else size + max_possible_size + sum([get_max_size(
-                            max_arity, max_depth-d)-1 for (d,*_) in stack]))
+                    # `f`.
+                    max_possible_size = (
+                        size + max_possible_size + outstanding_size)
 
                     if max_possible_size >= desired_value:
                         temp_functions.append(f)
@@ -176,30 +211,25 @@ def generate_program_(primitive_set, min_depth, max_depth, min_size,
             else:
                 program.append(function)
 
-            for _ in reversed(function.args):
-                # Add a placeholder stack element for each 
-                # argument needed by the chosen function.
-                stack.append((depth+1, size+function.arity))
+            # Add a placeholder stack element for each 
+            # argument needed by the chosen function.
+            depth_stack[sp:sp+function.arity] = [depth+1]*function.arity
+            size_stack[sp:sp+function.arity] = (
+                [size+function.arity]*function.arity)
+            sp += function.arity
 
     return program
 
 def generate_grow(primitive_set, min_depth, max_depth, min_size, max_size,
     desired_trait, ret_type=None):
 
-    def terminal_condition(stack, depth, size, ret_type,
-        primitive_set, min_depth, max_depth, min_size, max_size,
-        desired_trait, desired_value):
+    def terminal_condition(stack_depths, depth, size, valid_terminals,
+        valid_functions, primitive_set, min_depth, max_depth, min_size, 
+        max_size, desired_trait, desired_value):
         """Expression generation stops when the depth is equal to the desired
         depth or when it is randomly determined that a node should be a terminal.
         """
 
-        # List of valid terminals for the current node.
-        valid_terminals = [t for t in primitive_set.terminals[ret_type]] 
-
-        # List of valid functions for the current node.
-        valid_functions = [f for f in primitive_set.primitives[ret_type] 
-            if size+f.arity <= max_size]
-
         # Maximum function arity for the set of functions that
         # are valid for the current node.
         max_arity = (1 if valid_functions == [] else 
@@ -213,11 +243,10 @@ def generate_grow(primitive_set, min_depth, max_depth, min_size, max_size,
         # root node within the overall program is equal to `max_depth`.
         # (Note that when `valid_functions` is empty, the value of this 
         # variable is arbitrary.)
-        max_possible_size = (size if stack == [] else size + 
-            sum([get_max_size(max_arity, max_depth-d)-1
-                for (d,*_) in stack]))
+        max_possible_size = size + sum([max_sizes[max_arity][max_depth-d]-1
+            for d in stack_depths])
 
-        ret = ((valid_terminals != []) and
+        ret = ((len(valid_terminals) != 0) and
                 ((valid_functions == []) or 
                     (depth == max_depth) or
                     (size == max_size) or
@@ -362,7 +391,7 @@ def generate_program(gen_strategy, primitive_set, min_depth, max_depth,
 
 def add(x1, x2):
     """Return result of addition."""
-    return x1 + x2
+    return np.add(x1, x2)
 
 def aq(x1, x2):
     """Return result of analytical quotient.
@@ -371,45 +400,216 @@ def aq(x1, x2):
     'The use of an analytic quotient operator in genetic programming':  
     `aq(x1, x2) = (x1)/(sqrt(1+x2^(2)))`.
     """
-    return (x1) / (math.sqrt(1 + x2 ** (2)))
+    return x1 / np.sqrt(1.0 + x2*x2)
 
 def exp(x): 
     """Return result of exponentiation, base `e`."""
-    try:
-        return math.exp(x)
-    except OverflowError:
-        return float("inf")
+    with np.errstate(over='ignore'):
+        # Overflow results in infinity.
+        return np.exp(x)
 
 def log(x):
     """Return result of protected logarithm, base `e`."""
-    if x != 0:
-        return math.log(abs(x))
-    else:
-        return 0
+    with np.errstate(divide='ignore'):
+        return np.where(x != 0, np.log(np.abs(x)), 0.0)
 
 def mul(x1, x2):
     """Return result of multiplication."""
-    return x1 * x2
+    return np.multiply(x1, x2)
 
 def sin(x):
     """Return result of sine."""
-    return math.sin(x)
+    return np.sin(x)
 
 def sqrt(x):
     """Return result of protected square root."""
-    try:
-        return math.sqrt(x)
-    except ValueError:
-        # Input is negative.
-        return 0
+    # Negative inputs result in zero.
+    return np.sqrt(np.maximum(x, 0.0))
 
 def sub(x1, x2):
     """Return result of subtraction."""
-    return x1 - x2
+    return np.subtract(x1, x2)
 
 def tanh(x):
     """Return result of hyperbolic tangent."""
-    return math.tanh(x)
+    return np.tanh(x)
+
+
+########################################################################
+# Compilation and execution of programs as bytecode.
+########################################################################
+
+# Opcodes for terminals and for user-defined GP functions.
+(LOAD_VAR, LOAD_CONST, ADD, AQ, EXP, LOG, 
+    MUL, SIN, SQRT, SUB, TANH) = range(11)
+
+# Opcode for each GP function name.
+opcodes = {'add': ADD, 'aq': AQ, 'exp': EXP, 'log': LOG, 'mul': MUL,
+           'sin': SIN, 'sqrt': SQRT, 'sub': SUB, 'tanh': TANH}
+
+# Fast-math flags for compiled programs. (The `nnan` and `ninf` flags
+# are excluded, since programs may legitimately produce non-finite 
+# outputs, which must then result in an infinite fitness.)
+fastmath = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+def compile_to_bytecode(tree, primitive_set):
+    """Return bytecode for the given `PrimitiveTree` object.
+
+    The bytecode is a tuple of three arrays: the opcodes, given in 
+    postfix order, the argument for each opcode, and the constants.
+    The argument is the variable index for a variable load, the index 
+    into the constant array for a constant load, and the function 
+    arity for a function.
+
+    Keyword arguments:
+    tree -- `PrimitiveTree` object.
+    primitive_set -- Primitive set, of type `PrimitiveSet`, used
+        to generate `tree`.
+    """
+    ops, args, consts = [], [], []
+
+    # Stack of instructions whose arguments are not yet all emitted, 
+    # each paired with the number of such outstanding arguments.
+    pending = []
+
+    for node in tree:
+        if isinstance(node, gp.Primitive):
+            pending.append([(opcodes[node.name], node.arity), node.arity])
+        elif node.name in primitive_set.arguments:
+            pending.append([(LOAD_VAR, 
+                primitive_set.arguments.index(node.name)), 0])
+        else:
+            pending.append([(LOAD_CONST, len(consts)), 0])
+            consts.append(node.value)
+
+        # Emit every instruction for which all arguments are emitted.
+        while len(pending) != 0 and pending[-1][1] == 0:
+            (op, arg), _ = pending.pop()
+            ops.append(op)
+            args.append(arg)
+
+            if len(pending) != 0:
+                pending[-1][1] -= 1
+
+    return (np.array(ops, dtype=np.int32), np.array(args, dtype=np.int32),
+        np.array(consts, dtype=np.float64))
+
+def pack_bytecodes(bytecodes):
+    """Return the bytecodes for a set of programs, concatenated.
+
+    The result is a tuple of four arrays: the opcodes, arguments, and
+    constants of every program, concatenated, and the offsets such that
+    the opcodes (and arguments) of program `k` lie within the interval
+    `[offsets[k], offsets[k+1])`. Constant load arguments are adjusted 
+    to index into the concatenated constants.
+
+    Keyword arguments:
+    bytecodes -- Sequence of bytecodes given by `compile_to_bytecode`.
+    """
+    offsets = np.zeros(len(bytecodes)+1, dtype=np.int64)
+    all_args = []
+    num_consts = 0
+
+    for k, (ops, args, consts) in enumerate(bytecodes):
+        offsets[k+1] = offsets[k] + len(ops)
+        all_args.append(np.where(ops == LOAD_CONST, args+num_consts, args))
+        num_consts += len(consts)
+
+    return (np.concatenate([ops for (ops, *_) in bytecodes]), 
+        np.concatenate(all_args).astype(np.int32),
+        np.concatenate([consts for (*_, consts) in bytecodes]), offsets)
+
+@njit(cache=True, fastmath=fastmath, inline='always')
+def run_program(ops, args, consts, inputs, i, stack):
+    """Return program output for the fitness case with index `i`.
+
+    The bytecode is executed as a stack machine. The user-defined 
+    GP functions are inlined, for scalars.
+
+    Keyword arguments:
+    ops, args, consts -- Bytecode given by `compile_to_bytecode`.
+    inputs -- Array of input vectors, one per column.
+    i -- Index of fitness case.
+    stack -- Array for intermediate outputs, of the same length
+        as `ops`.
+    """
+    # Stack pointer.
+    sp = 0
+
+    for j in range(len(ops)):
+        op = ops[j]
+
+        if op == LOAD_VAR:
+            stack[sp] = inputs[args[j], i]
+            sp += 1
+        elif op == LOAD_CONST:
+            stack[sp] = consts[args[j]]
+            sp += 1
+        elif op == ADD:
+            stack[sp-2] = stack[sp-2] + stack[sp-1]
+            sp -= 1
+        elif op == AQ:
+            stack[sp-2] = stack[sp-2] / math.sqrt(
+                1.0 + stack[sp-1]*stack[sp-1])
+            sp -= 1
+        elif op == EXP:
+            # Overflow results in infinity.
+            stack[sp-1] = math.exp(stack[sp-1])
+        elif op == LOG:
+            x = stack[sp-1]
+            stack[sp-1] = 0.0 if x == 0 else math.log(abs(x))
+        elif op == MUL:
+            stack[sp-2] = stack[sp-2] * stack[sp-1]
+            sp -= 1
+        elif op == SIN:
+            stack[sp-1] = math.sin(stack[sp-1])
+        elif op == SQRT:
+            # Negative inputs result in zero.
+            x = stack[sp-1]
+            stack[sp-1] = 0.0 if x < 0 else math.sqrt(x)
+        elif op == SUB:
+            stack[sp-2] = stack[sp-2] - stack[sp-1]
+            sp -= 1
+        elif op == TANH:
+            stack[sp-1] = math.tanh(stack[sp-1])
+
+    return stack[0]
+
+@njit(cache=True, fastmath=fastmath, parallel=True)
+def evaluate_bin(ops, args, consts, offsets, inputs, target):
+    """Return array of RMSE fitness scores for a set of programs.
+
+    The programs are distributed across the available Numba threads,
+    if more than one, and the fitness cases are shared across all of 
+    the programs being evaluated. Programs with a non-finite output 
+    are given an infinite fitness.
+
+    Keyword arguments:
+    ops, args, consts, offsets -- Bytecode given by `pack_bytecodes`.
+    inputs -- Array of input vectors, one per column.
+    target -- Array of target values.
+    """
+    num_programs = len(offsets)-1
+    num_cases = len(target)
+    fitness = np.empty(num_programs)
+
+    for k in prange(num_programs):
+        # For each program...
+        start, end = offsets[k], offsets[k+1]
+        stack = np.empty(end-start)
+
+        # Sum of squared errors.
+        sse = 0.0
+
+        for i in range(num_cases):
+            error = target[i] - run_program(ops[start:end], 
+                args[start:end], consts, inputs, i, stack)
+            sse += error*error
+
+        rmse = math.sqrt(sse/num_cases)
+        fitness[k] = rmse if math.isfinite(rmse) else math.inf
+
+    return fitness
 
 
 ########################################################################
@@ -441,15 +641,36 @@ function_sets = {
     'nicolau_c': (nicolau_c, 4, 1)
 }
 
-# Maximum arity for each function set.
-max_arities = [max([arity for (_, arity) in function_set])
-    for _, (function_set, *_) in function_sets.items()]
+# Dictionary to map each function set name to some information that
+# is invariant for the function set, i.e., the function set itself, 
+# its maximum program depth, its size bin width, its maximum function 
+# arity, its maximum program size, and its number of size bins.
+function_set_meta = {}
+
+for name, (function_set, max_depth, bin_size) in function_sets.items():
+    max_arity = max([arity for (_, arity) in function_set])
+    max_possible_size = get_max_size(max_arity, max_depth)
+
+    function_set_meta[name] = dict(
+        function_set=function_set, max_depth=max_depth, 
+        bin_size=bin_size, max_arity=max_arity, 
+        max_size=max_possible_size, 
+        num_bins=int(math.ceil(max_possible_size/bin_size)))
 
 # Maximum number of size bins.
-max_num_size_bins = max([int(math.ceil(
-    get_max_size(max_arity, max_depth)/bin_size))
-    for (_, (_, max_depth, bin_size)), max_arity in 
-        zip(function_sets.items(), max_arities)])
+max_num_size_bins = max([meta['num_bins'] 
+    for meta in function_set_meta.values()])
+
+# Lookup table for `get_max_size`, used when generating programs,
+# where the element `max_sizes[m][d]` is the maximum possible size
+# for an `m`-ary program of depth `d`, for all relevant `m` and `d`.
+# (Nested lists are utilized, since indexing a NumPy array for a 
+# single element is comparatively slow.)
+max_sizes = [[get_max_size(m, d) 
+    for d in range(max([meta['max_depth'] 
+        for meta in function_set_meta.values()])+1)]
+    for m in range(max([meta['max_arity'] 
+        for meta in function_set_meta.values()])+1)]
 
 # Desired number of programs to be stored within each size bin.
 num_programs_per_size_bin = 128
@@ -482,13 +703,13 @@ for name, (function_set, max_depth, bin_size) in function_sets.items():
         for i in range(num_functions)]
 
     # Maximum arity for function set.
-    max_arity = max([arity for _, arity in function_set])
+    max_arity = function_set_meta[name]['max_arity']
 
     # Maximum program size for function set.
-    max_possible_size = get_max_size(max_arity, max_depth)
+    max_possible_size = function_set_meta[name]['max_size']
 
     # Number of size bins.
-    num_size_bins = int(math.ceil(max_possible_size/bin_size))
+    num_size_bins = function_set_meta[name]['num_bins']
 
     # Number of variables within primitive set.
     num_variables = num_functions-1
@@ -542,6 +763,17 @@ for name, (function_set, max_depth, bin_size) in function_sets.items():
         # Number of distinct random programs generated for size bin `i`.
         j = 0
 
+        # String representations of the programs within size bin `i`.
+        program_strs = set()
+
+        # Initialize the relevant program dictionary tuple, such that
+        # the numbers of instances for each type of function, variable
+        # terminal, and constant terminal are accumulated in place.
+        program_dict[name][i] = ([], [], [], 
+            np.zeros(num_functions, dtype=np.int64),
+            np.zeros(num_variables, dtype=np.int64),
+            np.zeros(num_constants, dtype=np.int64))
+
         while j < num_programs_per_size_bin:
 
             program = generate_program(
@@ -555,8 +787,6 @@ for name, (function_set, max_depth, bin_size) in function_sets.items():
 
             # Extract some information about the program.
 
-            nodes, edges, labels = gp.graph(program)
-
             # Programs of interest (POI).
             # poi = (('nicolau_c', 5, 63), ('nicolau_c', 9, 60), 
             #        ('nicolau_c', 10, 18), ('nicolau_c', 11, 111),
@@ -570,6 +800,7 @@ for name, (function_set, max_depth, bin_size) in function_sets.items():
             # for name_, i_, j_ in poi:
             #     if (name == name_) and (i == i_) and (j == j_):
             #         # Print graphical representation of specified program.
+            #         nodes, edges, labels = gp.graph(program)
             #         g = pgv.AGraph()
             #         g.add_nodes_from(nodes)
             #         g.add_edges_from(edges)
@@ -583,7 +814,10 @@ for name, (function_set, max_depth, bin_size) in function_sets.items():
             #                f'{name}_bin_{i}_program_{j}.pdf')
 
             # Size of program.
-            size = nodes[-1]+1
+            size = len(program)
+
+            # Depth of program.
+            depth = get_depth(program)
 
             # A tree representation of the program.
             program = gp.PrimitiveTree(program)
@@ -591,9 +825,6 @@ for name, (function_set, max_depth, bin_size) in function_sets.items():
             # String representation of program.
             program_str = str(program)
 
-            # Depth of program.
-            depth = program.height
-
             # Ensure that the program depth and size are permissible.
             if (depth > max_depth) or (size > max_size): 
                 print('Uh-oh...')
@@ -610,36 +841,28 @@ for name, (function_set, max_depth, bin_size) in function_sets.items():
             # information to the dictionary if this new program is 
             # syntactically (not semantically) distinct from all 
             # other programs stored in the relevant bin.
-            if programs.count(program_str) == 0:
+            if program_str not in program_strs:
 
                 # Increment number of distinct random programs.
                 j += 1
+                program_strs.add(program_str)
 
                 # Preserve `PrimitiveTree` object.
                 primitive_trees[name][i].append(program)
 
                 # Extract some additional information about the program.
 
+                # Number of instances for each node name, where the name
+                # of a terminal is its value (as given by `gp.graph`).
+                node_counts = Counter(node.value if isinstance(
+                    node, gp.Terminal) else node.name for node in program)
+
                 # Numbers of instances for each type of function,
                 # variable terminal, and constant terminal.
-                function_count = [0]*(num_functions)
-                variable_count = [0]*(num_variables)
-                constant_count = [0]*(num_constants)
-                
-                for node in nodes:
-
-                    node_name = labels[node]
-
-                    if (node_name in function_names):
-                        index = function_names.index(node_name)
-                        function_count[index] += 1
-                    elif (node_name in variable_names):
-                        index = variable_names.index(node_name)
-                        variable_count[index] += 1
-                    else:
-                        index = constant_names.index(node_name)
-                        constant_count[index] += 1
-
+                function_count, variable_count, constant_count = (
+                    np.array([node_counts.get(n, 0) for n in names], 
+                        dtype=np.int64) for names in (function_names, 
+                            variable_names, constant_names))
 
                 # Update the elements of the relevant dictionary tuple.
 
@@ -647,20 +870,9 @@ for name, (function_set, max_depth, bin_size) in function_sets.items():
                 depths.append(depth)
                 sizes.append(size)
 
-                function_counts = function_count if (
-                    function_counts == []) else ([sum(i) for i in 
-                        list(zip(function_counts, function_count))])
-                    
-                variable_counts = variable_count if (
-                    variable_counts == []) else ([sum(i) for i in 
-                        list(zip(variable_counts, variable_count))])
-
-                constant_counts = constant_count if (
-                    constant_counts == []) else ([sum(i) for i in 
-                        list(zip(constant_counts, constant_count))])
-
-                program_dict[name][i] = (programs, depths, sizes,
-                    function_counts, variable_counts, constant_counts)
+                function_counts += function_count
+                variable_counts += variable_count
+                constant_counts += constant_count
             
             
 # Pickle the relevant dictionary, so that it can be used by
@@ -677,13 +889,10 @@ with open(f'{root_dir}/programs.pkl', 'wb') as f:
 
 # print('Numbers of programs:')
 
-for name, (_, max_depth, bin_size) in function_sets.items():
-
-    # Maximum program size for function set.
-    max_size = get_max_size(max_arity, max_depth)
+for name in function_sets:
 
     # Number of size bins.
-    num_size_bins = int(math.ceil(max_size/bin_size))
+    num_size_bins = function_set_meta[name]['num_bins']
 
     # Number of programs per size bin.
     num_programs = [len(programs) for programs,*_ in program_dict[name]]
@@ -711,52 +920,117 @@ for name, (_, max_depth, bin_size) in function_sets.items():
 # Fitness outputs.
 
 
-def evaluate(primitive_set, trees, inputs, target):
-    """Return list of fitness scores for programs.
+def evaluate(bytecode, inputs, target):
+    """Return array of fitness scores for programs.
     
-    The "R-squared" function implemented by the `sklearn.metrics` 
-    module is used as a fitness function.
+    The root-mean-square error (RMSE) between the program outputs 
+    and the target is used as a fitness function.
 
     Keyword arguments:
-    primitive_set -- Primitive set, of type `PrimitiveSet`, used to 
-        compile each `PrimitiveTree` object given by `trees`.
-    trees -- Tuple of `PrimitiveTree` objects.
-    inputs -- Tuple of input vectors.
-    target -- Tuple of target vectors.
+    bytecode -- Bytecode for the programs, given by `pack_bytecodes`.
+    inputs -- Array of input vectors, one per column.
+    target -- Array of target values.
+    """
+    # Calculate fitness scores for the set of programs by way of Numba.
+    # (The programs are distributed across the threads that Numba makes
+    # available. Note that each profiling worker process is limited to
+    # a single thread, so that, within this script, the programs of a 
+    # size bin are always evaluated serially; see `init_worker`.)
+    return evaluate_bin(*bytecode, inputs, target)
+
+def get_physical_cores():
+    """Return one available logical CPU core per physical core.
+
+    Logical cores that share a physical core (e.g., by way of SMT) 
+    are identified by way of the Linux `sysfs` CPU topology. If the
+    topology is unavailable, each logical core is considered to be
+    its own physical core.
     """
+    # Dictionary to map the siblings of each physical core to 
+    # the first available logical core among these siblings.
+    cores = {}
 
-    def evaluate_(tree):
+    for cpu in sorted(os.sched_getaffinity(0)):
         try:
-            # Transform `PrimitiveTree` object into a callable function.
-            program = gp.compile(tree, primitive_set)
-
-            # Calculate program outputs, i.e., estimations of target vector.
-            estimated = tuple(program(*input) for input in inputs)
-
-            # Calculate and return fitness.
-            return math.sqrt(mean_squared_error(target, estimated))
-        except ValueError:
-            return float("inf")
-
-    # Calculate fitness scores for the set of trees in parallel, by way 
-    # of the `pathos.pools` module. Note that this module is utilized 
-    # instead of the standard `multiprocessing` module since the latter 
-    # does not readily support lambda functions. (All available logical 
-    # CPU cores are utilized by default. To utilize a different amount, 
-    # specify the `nodes` attribute via the `ProcessPool` constructor.
-    # This property can also be printed out, if need be.)
-    fitness = ProcessPool().map(evaluate_, trees)
-
-    # fitness = []
-    # for tree in trees:
-    #     fitness.append(evaluate_(tree))
+            with open(f'/sys/devices/system/cpu/cpu{cpu}/topology/'
+                      f'thread_siblings_list', 'r') as f:
+                siblings = f.read().strip()
+        except OSError:
+            siblings = str(cpu)
 
-    return fitness
+        cores.setdefault(siblings, cpu)
+
+    return sorted(cores.values())
+
+def init_worker(cores, num_workers):
+    """Initialize a profiling worker process.
+
+    The worker process is pinned to its own logical CPU core, so as
+    to reduce timing noise, and Numba is made to utilize a single
+    thread within it, accordingly.
+
+    Keyword arguments:
+    cores -- Sequence of logical CPU cores, one per worker process.
+    num_workers -- Shared counter of initialized worker processes, 
+        of type `multiprocessing.Value`.
+    """
+    with num_workers.get_lock():
+        core = cores[num_workers.value % len(cores)]
+        num_workers.value += 1
+
+    os.sched_setaffinity(0, {core})
+    set_num_threads(1)
+
+def profile_bin(num_variables, nfc, bytecode):
+    """Return fitness scores and median average runtimes for a size bin.
+
+    Keyword arguments:
+    num_variables -- Number of variables for the relevant primitive set.
+    nfc -- Number of fitness cases.
+    bytecode -- Bytecode for the programs within the size bin, given
+        by `pack_bytecodes`.
+    """
+    # Fitness cases relevant to function set and `nfc`, stored
+    # such that the values of each variable are contiguous.
+    inputs = np.ascontiguousarray(inputs_[:nfc, :num_variables].T)
+
+    # Target relevant to `nfc`.
+    target = target_[:nfc]
+
+    # Fitness values for the size bin.
+    fitness = evaluate(bytecode, inputs, target)
+
+    # Median average runtimes for the size bin, one per epoch.
+    med_avg_runtimes = []
+
+    for _ in range(num_epochs):
+        # For each epoch...
+
+        # Raw runtimes after running the `evaluate` function a 
+        # total of `repeat * number` times. The resulting object 
+        # is a list of `repeat` values, where each represents a 
+        # raw runtime after running the relevant code `number` 
+        # times.
+        # (The arguments are bound as default values so that no
+        # closure or global lookups occur within the timed code.)
+        runtimes = timeit.Timer(
+            stmt=lambda evaluate=evaluate, bytecode=bytecode, 
+                inputs=inputs, target=target: evaluate(
+                    bytecode, inputs, target)).repeat(
+                        repeat=repeat, number=number)
+
+        # Average runtimes, taking into account `number`.
+        avg_runtimes = [runtime/number for runtime in runtimes]
+
+        # Calculate and append median average runtime.
+        med_avg_runtimes.append(np.median(avg_runtimes))
+
+    return (fitness, med_avg_runtimes)
 
 
 # Maximum number of variables across all functions sets.
-max_num_variables = max([len(function_set)-1 
-    for (function_set, *_) in function_sets.items()])
+max_num_variables = max([len(meta['function_set'])-1 
+    for meta in function_set_meta.values()])
 
 # Numbers of fitness cases.
 num_fitness_cases = (10, 100, 1000, 10000, 100000)
@@ -788,6 +1062,18 @@ repeat = 1
 # Value for the `number` argument of the `timeit.repeat` method.
 number = 1
 
+# Logical CPU cores to which worker processes are pinned, one per 
+# physical core, so that no two timed worker processes share a 
+# physical core.
+cores = get_physical_cores()
+
+# Number of worker processes. Note that concurrent worker processes 
+# still share the last-level cache and memory bandwidth, which can 
+# inflate runtimes, particularly for large numbers of fitness cases. 
+# For runtimes free of such contention (at the cost of a serial run),
+# set this value to 1.
+max_workers = len(cores)
+
 # Median average runtimes for programs within each size bin,
 # for each number of fitness cases, for each function set.
 med_avg_runtimes = []
@@ -795,21 +1081,20 @@ med_avg_runtimes = []
 # Fitness outputs.
 fitnesses = []
 
-for name, (function_set, max_depth, bin_size) in function_sets.items():
+# Profiling tasks, one for each function set, number of fitness cases,
+# and size bin. Each task is a tuple that contains the indices of the 
+# relevant results, followed by the arguments for `profile_bin`.
+tasks = []
+
+for k, (name, (function_set, max_depth, bin_size)) in enumerate(
+    function_sets.items()):
     # For each function set...
-    print(f'Function set `{name}`:')
 
     # Number of functions within function set.
     num_functions = len(function_set)
 
-    # Maximum arity for function set.
-    max_arity = max([arity for _, arity in function_set])
-
-    # Maximum program size for function set.
-    max_possible_size = get_max_size(max_arity, max_depth)
-
     # Number of size bins.
-    num_size_bins = int(math.ceil(max_possible_size/bin_size))
+    num_size_bins = function_set_meta[name]['num_bins']
 
     # Primitive set relevant to function set.
     primitive_set = primitive_sets[name]
@@ -817,59 +1102,40 @@ for name, (function_set, max_depth, bin_size) in function_sets.items():
     # Number of variables for primitive set.
     num_variables = num_functions - 1
 
-    # Prepare for statistics relevant to function set.
-    # sizes.append([])
-    med_avg_runtimes.append([])
-    fitnesses.append([])
-
-    # For each amount of fitness cases, and for each size bin, 
-    # calculate the relevant statistics.
-
-    for nfc in num_fitness_cases:
-    # for nfc in (10,):
-        # For each number of fitness cases...
-        print(f'Number of fitness cases: `{nfc}`')
+    # Bytecode for the `PrimitiveTree` objects of each size bin, 
+    # compiled only once so that compilation is excluded from 
+    # the timings.
+    bytecodes = [pack_bytecodes([compile_to_bytecode(tree, primitive_set) 
+        for tree in primitive_trees[name][i]]) 
+        for i in range(num_size_bins)]
+
+    # Prepare for statistics relevant to the function set, 
+    # the numbers of fitness cases, and the size bins.
+    med_avg_runtimes.append(
+        [[[] for _ in range(num_size_bins)] for _ in num_fitness_cases])
+    fitnesses.append(
+        [[[] for _ in range(num_size_bins)] for _ in num_fitness_cases])
+
+    for j, nfc in enumerate(num_fitness_cases):
+        for i in range(num_size_bins):
+            tasks.append((k, j, i, num_variables, nfc, bytecodes[i]))
 
-        # Fitness cases relevant to function set and `nfc`.
-        inputs = inputs_[:nfc, :num_variables]
+# Calculate the relevant statistics for each task in parallel. Note 
+# that the `fork` start method is required, so that worker processes 
+# inherit the state of this script rather than re-executing it.
+context = mp.get_context('fork')
 
-        # Target relevant to `nfc`.
-        target = target_[:nfc]
+with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, 
+    initializer=init_worker, initargs=(cores, context.Value('i', 0))
+    ) as executor:
 
-        # Prepare for statistics relevant to the 
-        # numbers of fitness cases and size bins.
-        med_avg_runtimes[-1].append([[] for _ in range(num_size_bins)])
-        fitnesses[-1].append([[] for _ in range(num_size_bins)])
+    futures = [executor.submit(profile_bin, *task[3:]) for task in tasks]
 
-        for i in range(num_size_bins):
-            # For each size bin...
-            print(f'({dt.datetime.now().ctime()}) Size bin `{i+1}`...')
-
-            # `PrimitiveTree` objects for size bin `i`.
-            trees = tuple(primitive_trees[name][i])
-
-            # Calculate and append fitness values for current size bin.
-            fitnesses[-1][-1][i] = evaluate(
-                primitive_set, trees, inputs, target)
-
-            for _ in range(num_epochs):
-                # For each epoch...
-
-                # Raw runtimes after running the `fitness_func_wrap` 
-                # function a total of `repeat * number` times. 
-                # The resulting object is a list of `repeat` values,
-                # where each represents a raw runtime after running
-                # the relevant code `number` times.
-                runtimes = timeit.Timer(
-                    'evaluate(primitive_set, trees, inputs, target)',
-                    globals=globals()).repeat(repeat=repeat, number=number)
-
-                # Average runtimes, taking into account `number`.
-                avg_runtimes = [runtime/number for runtime in runtimes]
-
-                # Calculate and append median average runtime.
-                med_avg_runtimes[-1][-1][i].append(
-                    np.median(avg_runtimes))
+    for (k, j, i, _, nfc, _), future in zip(tasks, futures):
+        fitnesses[k][j][i], med_avg_runtimes[k][j][i] = future.result()
+        print(f'({dt.datetime.now().ctime()}) Function set '
+              f'`{list(function_sets)[k]}`, number of fitness cases '
+              f'`{nfc}`, size bin `{i+1}`: done.')
 
 # Preserve results.
 results = [fitnesses, med_avg_runtimes]